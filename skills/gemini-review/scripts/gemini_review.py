@@ -11,14 +11,67 @@ Usage:
     python gemini_review.py --files "src/main.py" --json --think high
 """
 
-import argparse
+import hashlib
+import importlib.util
+import io
+from concurrent.futures import ThreadPoolExecutor
 import json
 import os
 import re
+import subprocess
 import sys
+import time
 from pathlib import Path
 from typing import Optional
 
+MODEL = "gemini-3-flash-preview"
+
+# On-disk cache for review responses: identical (code, focus, thinking
+# level, model) combinations return the stored result instead of paying
+# for another API round trip.
+CACHE_DIR = Path.home() / '.cache' / 'gemini-review'
+CACHE_TTL_SECONDS = 7 * 24 * 3600  # 7 days
+
+# Extracts JSON wrapped in a markdown code fence (non-greedy, first
+# fence only). Compiled once so parse_json_response skips the per-call
+# pattern lookup.
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)\s*```', re.DOTALL)
+
+# Complexity indicators for calculate_thinking_level, matched in a
+# single sweep. Security keywords are case-insensitive via an inline
+# flag group; async/await and class declarations stay case-sensitive.
+_COMPLEXITY_RE = re.compile(
+    r'(?P<sec>(?i:password|auth|token|secret|encrypt|sql|query))'
+    r'|(?P<asy>async|await)'
+    r'|(?P<cls>class )')
+
+# File types that never go to review
+_SKIP_EXTENSIONS = {'.json', '.yaml', '.yml', '.toml', '.md', '.txt', '.lock', '.log'}
+
+# Box-drawing literals for the formatted output
+_HR = "═" * 65
+_HR_THIN = "─" * 65
+_BOX_TOP = "┌" + "─" * 63 + "┐"
+_BOX_MID = "├" + "─" * 63 + "┤"
+_BOX_BOT = "└" + "─" * 63 + "┘"
+
+# Prefer orjson for (de)serialization when available - noticeably faster
+# on large review payloads - but fall back to stdlib json transparently.
+try:
+    import orjson
+
+    def _loads(text):
+        return orjson.loads(text)
+
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def _loads(text):
+        return json.loads(text)
+
+    def _dumps(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+
 # JSON Schema for review output
 JSON_SCHEMA = """{
   "summary": {
@@ -46,6 +99,10 @@ JSON_SCHEMA = """{
 }"""
 
 
+_ENV_KEY_RE = re.compile(r'^\s*GEMINI_API_KEY=(.+)$', re.MULTILINE)
+_ENV_CACHE = {"mtime": None, "key": None}
+
+
 def get_api_key() -> Optional[str]:
     """Get API key from environment or .env file."""
     api_key = os.environ.get('GEMINI_API_KEY')
@@ -53,41 +110,71 @@ def get_api_key() -> Optional[str]:
         return api_key
 
     env_file = Path.cwd() / '.env'
-    if env_file.exists():
-        with open(env_file) as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith('GEMINI_API_KEY='):
-                    value = line.split('=', 1)[1]
-                    return value.strip('"\'')
-    return None
+    try:
+        mtime = env_file.stat().st_mtime
+    except OSError:
+        return None
+
+    # Re-parse only when .env has actually changed
+    if _ENV_CACHE["mtime"] == mtime:
+        return _ENV_CACHE["key"]
 
+    match = _ENV_KEY_RE.search(env_file.read_text())
+    key = match.group(1).strip().strip('"\'') if match else None
+    _ENV_CACHE.update(mtime=mtime, key=key)
+    return key
 
-def ensure_genai_installed():
-    """Ensure google-genai package is installed."""
+
+def ensure_genai_installed() -> bool:
+    """Check that google-genai is available without importing it."""
     try:
-        from google import genai
+        return importlib.util.find_spec("google.genai") is not None
+    except ModuleNotFoundError:
+        # find_spec imports the parent package, which raises when the
+        # google namespace itself is missing
+        return False
+
+
+def install_genai() -> bool:
+    """Install google-genai (only on explicit --install request)."""
+    print("📦 Installing google-genai package...")
+    try:
+        subprocess.check_call(
+            [sys.executable, "-m", "pip", "install", "-q", "google-genai"])
         return True
-    except ImportError:
-        print("📦 Installing google-genai package...")
-        result = os.system(f"{sys.executable} -m pip install -q google-genai")
-        return result == 0
+    except subprocess.CalledProcessError:
+        return False
 
 
-def calculate_thinking_level(files: list, code_content: str) -> str:
+def calculate_thinking_level(files: list, code_parts: list) -> str:
     """Auto-detect appropriate thinking level based on code complexity."""
-    total_lines = code_content.count('\n')
     file_count = len(files)
 
-    # Check for complexity indicators
-    has_security_code = any(kw in code_content.lower() for kw in
-        ['password', 'auth', 'token', 'secret', 'encrypt', 'sql', 'query'])
-    has_async = 'async' in code_content or 'await' in code_content
-    has_classes = code_content.count('class ') > 2
+    # File count alone can guarantee "high" - skip the content scan
+    if file_count >= 6:
+        return "high"
+
+    total_lines = sum(part.count('\n') for part in code_parts)
+    base_score = min(total_lines / 200, 2) + file_count * 0.5
+    if base_score >= 3:
+        return "high"
+
+    # Check for complexity indicators in a single sweep per part
+    security_hits = async_hits = class_hits = 0
+    for part in code_parts:
+        for match in _COMPLEXITY_RE.finditer(part):
+            group = match.lastgroup
+            if group == 'sec':
+                security_hits += 1
+            elif group == 'asy':
+                async_hits += 1
+            else:
+                class_hits += 1
+    has_security_code = security_hits > 0
+    has_async = async_hits > 0
+    has_classes = class_hits > 2
 
-    complexity_score = 0
-    complexity_score += min(total_lines / 200, 2)  # Max 2 points for lines
-    complexity_score += file_count * 0.5  # 0.5 per file
+    complexity_score = base_score
     complexity_score += 1 if has_security_code else 0
     complexity_score += 0.5 if has_async else 0
     complexity_score += 0.5 if has_classes else 0
@@ -100,8 +187,12 @@ def calculate_thinking_level(files: list, code_content: str) -> str:
         return "high"
 
 
-def build_review_prompt(code_content: str, focus: Optional[str] = None) -> str:
-    """Build the review prompt with Conventional Comments methodology."""
+def build_review_prompt(code_parts: list, focus: Optional[str] = None) -> str:
+    """Build the review prompt with Conventional Comments methodology.
+
+    Takes the per-file code parts and assembles the prompt in a single
+    StringIO so the code bundle is never materialized twice.
+    """
 
     focus_instruction = ""
     if focus:
@@ -112,7 +203,8 @@ def build_review_prompt(code_content: str, focus: Optional[str] = None) -> str:
         }
         focus_instruction = focus_map.get(focus, "")
 
-    return f"""You are an expert code reviewer using Conventional Comments methodology.
+    buf = io.StringIO()
+    buf.write(f"""You are an expert code reviewer using Conventional Comments methodology.
 
 ## Review Methodology
 
@@ -134,7 +226,12 @@ def build_review_prompt(code_content: str, focus: Optional[str] = None) -> str:
 
 ## Code to Review
 
-{code_content}
+""")
+    for i, part in enumerate(code_parts):
+        if i:
+            buf.write('\n\n')
+        buf.write(part)
+    buf.write(f"""
 
 ## Output Requirements
 
@@ -150,45 +247,53 @@ IMPORTANT:
 - effort: trivial (<5min), small (<30min), medium (<2hr), large (>2hr)
 - If code is excellent with no issues, verdict="approve" with empty issues array
 - Maximum 10 issues unless code has serious problems
-- Always include at least one positive_aspect"""
+- Always include at least one positive_aspect""")
+    return buf.getvalue()
 
 
 def parse_json_response(response_text: str) -> dict:
     """Parse and validate JSON response from Gemini."""
-    # Try to extract JSON if wrapped in markdown
-    json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', response_text)
-    if json_match:
-        response_text = json_match.group(1)
-
-    # Clean up common issues
     response_text = response_text.strip()
 
+    # response_mime_type makes the model return raw JSON; the fence
+    # extraction only remains as a fallback for non-conforming output.
+    if not response_text.startswith('{'):
+        json_match = _JSON_FENCE_RE.search(response_text)
+        if json_match:
+            response_text = json_match.group(1)
+
     try:
-        data = json.loads(response_text)
+        data = _loads(response_text)
 
-        # Validate required fields
-        if "summary" not in data:
-            data["summary"] = {"verdict": "request_changes", "overview": "Review completed", "stats": {}}
-        if "issues" not in data:
-            data["issues"] = []
-        if "positive_aspects" not in data:
-            data["positive_aspects"] = []
+        # Validate required fields; well-formed responses skip the
+        # defaulting branches entirely
+        if not ("summary" in data and "issues" in data and "positive_aspects" in data):
+            data.setdefault("summary", {"verdict": "request_changes",
+                                        "overview": "Review completed", "stats": {}})
+            data.setdefault("issues", [])
+            data.setdefault("positive_aspects", [])
 
         # Ensure issues have IDs
         for i, issue in enumerate(data["issues"], 1):
             if "id" not in issue:
                 issue["id"] = i
 
-        # Calculate stats if missing
+        # Calculate stats in a single pass over the issues
         if "stats" not in data["summary"]:
             data["summary"]["stats"] = {}
-        stats = data["summary"]["stats"]
-        stats["blocking"] = sum(1 for i in data["issues"] if i.get("severity") == "blocking")
-        stats["warning"] = sum(1 for i in data["issues"] if i.get("severity") == "non-blocking")
-        stats["suggestion"] = sum(1 for i in data["issues"] if i.get("type") == "suggestion")
+        blocking = warning = suggestion = 0
+        for issue in data["issues"]:
+            if issue.get("severity") == "blocking":
+                blocking += 1
+            elif issue.get("severity") == "non-blocking":
+                warning += 1
+            if issue.get("type") == "suggestion":
+                suggestion += 1
+        data["summary"]["stats"].update(
+            blocking=blocking, warning=warning, suggestion=suggestion)
 
         return data
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         return {
             "error": "JSON_PARSE_ERROR",
             "message": f"Failed to parse response: {e}",
@@ -196,12 +301,82 @@ def parse_json_response(response_text: str) -> dict:
         }
 
 
+def _cache_path(cache_key: str) -> Path:
+    """Return the cache file path for a given key (sharded by prefix)."""
+    return CACHE_DIR / cache_key[:2] / cache_key
+
+
+def _cache_lookup(cache_key: str) -> Optional[dict]:
+    """Return a cached review result if present and fresh, else None."""
+    path = _cache_path(cache_key)
+    try:
+        if time.time() - path.stat().st_mtime < CACHE_TTL_SECONDS:
+            return _loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _cache_store(cache_key: str, result: dict) -> None:
+    """Persist a review result; cache failures are never fatal."""
+    path = _cache_path(cache_key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(result), encoding='utf-8')
+    except OSError:
+        pass
+
+
+def _read_one(file_path: str) -> tuple:
+    """Load a single file for review.
+
+    Returns (file_path, code_part, is_valid) where code_part is None for
+    files that should be silently skipped.
+    """
+    path = Path(file_path)
+    if not path.exists() or not path.is_file():
+        return file_path, None, False
+    if path.suffix.lower() in _SKIP_EXTENSIONS:
+        return file_path, None, False
+
+    try:
+        # Oversized files keep their head and tail with an elision
+        # marker instead of being dropped - bounded memory, but the
+        # model still gets the most useful context. The size check uses
+        # stat alone so we never decode more than 40 KB of a large file.
+        size = path.stat().st_size
+        if size > 50000:
+            with path.open('rb') as f:
+                head = f.read(30000).decode('utf-8', errors='replace')
+                f.seek(size - 10000)
+                tail = f.read().decode('utf-8', errors='replace')
+            content = (f"{head}\n\n[... {size - 40000} bytes elided - "
+                       f"line numbers below are offset ...]\n\n{tail}")
+        else:
+            content = path.read_text(encoding='utf-8', errors='replace')
+        # Add line numbers for reference
+        numbered_content = '\n'.join(
+            f"{i:4d} | {line}"
+            for i, line in enumerate(content.splitlines(), 1))
+        code_part = (f"### {file_path}\n```{path.suffix[1:] if path.suffix else ''}\n"
+                     f"{numbered_content}\n```")
+        return file_path, code_part, True
+    except OSError as e:
+        return file_path, f"### {file_path}\n[Error reading: {e}]", False
+
+
 def review_code(files: list, focus: Optional[str] = None,
-                thinking_level: Optional[str] = None, output_json: bool = False) -> dict:
+                thinking_level: Optional[str] = None, output_json: bool = False,
+                use_cache: bool = True) -> dict:
     """Send code to Gemini for review."""
 
+    if not files:
+        return {"error": "NO_FILES", "message": "No valid code files to review"}
+
     if not ensure_genai_installed():
-        return {"error": "INSTALL_FAILED", "message": "Could not install google-genai"}
+        return {"error": "GENAI_MISSING",
+                "message": "google-genai not installed. Run with --install "
+                           "or: pip install google-genai"}
 
     from google import genai
 
@@ -209,50 +384,52 @@ def review_code(files: list, focus: Optional[str] = None,
     if not api_key:
         return {"error": "NO_API_KEY", "message": "GEMINI_API_KEY not found"}
 
-    # Read file contents
+    # Read file contents in parallel; reads release the GIL so disk
+    # latency overlaps instead of serializing. Results come back via
+    # map(), which preserves the input order.
     code_parts = []
     valid_files = []
-    skip_extensions = {'.json', '.yaml', '.yml', '.toml', '.md', '.txt', '.lock', '.log'}
-
-    for file_path in files:
-        path = Path(file_path)
-        if not path.exists() or not path.is_file():
-            continue
-        if path.suffix.lower() in skip_extensions:
-            continue
-
-        try:
-            content = path.read_text(encoding='utf-8')
-            if len(content) > 50000:
-                code_parts.append(f"### {file_path}\n[File too large - {len(content)} bytes, skipped]")
-            else:
-                # Add line numbers for reference
-                numbered_lines = []
-                for i, line in enumerate(content.split('\n'), 1):
-                    numbered_lines.append(f"{i:4d} | {line}")
-                numbered_content = '\n'.join(numbered_lines)
-                code_parts.append(f"### {file_path}\n```{path.suffix[1:] if path.suffix else ''}\n{numbered_content}\n```")
+    with ThreadPoolExecutor(max_workers=min(16, len(files))) as executor:
+        for file_path, code_part, is_valid in executor.map(_read_one, files):
+            if code_part is not None:
+                code_parts.append(code_part)
+            if is_valid:
                 valid_files.append(file_path)
-        except Exception as e:
-            code_parts.append(f"### {file_path}\n[Error reading: {e}]")
 
     if not valid_files:
         return {"error": "NO_FILES", "message": "No valid code files to review"}
 
-    code_content = '\n\n'.join(code_parts)
-
     # Auto-detect thinking level if not specified
     if not thinking_level:
-        thinking_level = calculate_thinking_level(valid_files, code_content)
-
-    prompt = build_review_prompt(code_content, focus)
+        thinking_level = calculate_thinking_level(valid_files, code_parts)
+
+    # Check the on-disk cache before paying for an API call. The key is
+    # hashed incrementally from the code parts so we never concatenate
+    # the bundle a second time just for hashing; on a hit we also skip
+    # building the prompt altogether.
+    hasher = hashlib.sha256()
+    hasher.update(f"{MODEL}\x00{focus}\x00{thinking_level}\x00".encode())
+    for part in code_parts:
+        hasher.update(part.encode())
+        hasher.update(b"\x00")
+    cache_key = hasher.hexdigest()
+    if use_cache:
+        cached = _cache_lookup(cache_key)
+        if cached is not None:
+            cached.setdefault("meta", {})["cache"] = "hit"
+            return cached
+
+    prompt = build_review_prompt(code_parts, focus)
 
     # Call Gemini API
     try:
         client = genai.Client(api_key=api_key)
 
+        # Ask for raw JSON so the model skips the markdown fence tokens
+        # and parse_json_response takes its direct-parse path
+        config = {"response_mime_type": "application/json"}
+
         # Configure thinking based on level
-        config = {}
         if thinking_level == "high":
             config["temperature"] = 0.2
         elif thinking_level == "minimal":
@@ -260,20 +437,38 @@ def review_code(files: list, focus: Optional[str] = None,
         else:
             config["temperature"] = 0.3
 
-        response = client.models.generate_content(
-            model="gemini-3-flash-preview",
+        # Stream the response so we start consuming tokens as they arrive
+        # instead of blocking on the full completion. Progress goes to
+        # stderr so stdout stays clean for --json consumers.
+        if not output_json:
+            print(f"🔍 Reviewing {', '.join(valid_files)} ...",
+                  file=sys.stderr, flush=True)
+
+        response = client.models.generate_content_stream(
+            model=MODEL,
             contents=prompt,
             config=config if config else None
         )
 
-        result = parse_json_response(response.text)
+        buf = io.StringIO()
+        for chunk in response:
+            if chunk.text:
+                buf.write(chunk.text)
+                if not output_json:
+                    print(".", end="", file=sys.stderr, flush=True)
+        if not output_json:
+            print(file=sys.stderr)
+
+        result = parse_json_response(buf.getvalue())
 
         if "error" not in result:
             result["meta"] = {
                 "files": valid_files,
                 "thinking_level": thinking_level,
-                "focus": focus
+                "focus": focus,
+                "cache": "miss"
             }
+            _cache_store(cache_key, result)
 
         return result
 
@@ -288,9 +483,9 @@ def format_interactive_output(result: dict) -> str:
     """Format review result with numbered issues for selection."""
     lines = []
     lines.append("")
-    lines.append("═" * 65)
+    lines.append(_HR)
     lines.append("🔍 GEMINI CODE REVIEW")
-    lines.append("═" * 65)
+    lines.append(_HR)
     lines.append("")
 
     if "error" in result:
@@ -337,53 +532,64 @@ def format_interactive_output(result: dict) -> str:
         lines.append(summary.get("overview", ""))
         lines.append("")
 
-        # Group issues by severity
-        blocking_issues = [i for i in issues if i.get("severity") == "blocking"]
-        warning_issues = [i for i in issues if i.get("severity") == "non-blocking" and i.get("type") != "suggestion"]
-        suggestion_issues = [i for i in issues if i.get("type") == "suggestion"]
+        # Group issues by severity in a single pass
+        blocking_issues = []
+        warning_issues = []
+        suggestion_issues = []
+        for issue in issues:
+            severity = issue.get("severity")
+            is_suggestion = issue.get("type") == "suggestion"
+            if severity == "blocking":
+                blocking_issues.append(issue)
+            elif severity == "non-blocking" and not is_suggestion:
+                warning_issues.append(issue)
+            if is_suggestion:
+                suggestion_issues.append(issue)
 
         # Blocking issues
         if blocking_issues:
-            lines.append("┌" + "─" * 63 + "┐")
+            lines.append(_BOX_TOP)
             lines.append("│ 🚨 BLOCKING (Must Fix)" + " " * 40 + "│")
-            lines.append("├" + "─" * 63 + "┤")
+            lines.append(_BOX_MID)
             for issue in blocking_issues:
-                file_line = f"{issue.get('file', '?')}:{issue.get('line', '?')}"
-                title = issue.get('title', 'Issue')[:40]
-                effort = issue.get('effort', '?')
+                get = issue.get
+                file_line = f"{get('file', '?')}:{get('line', '?')}"
+                title = get('title', 'Issue')[:40]
+                effort = get('effort', '?')
                 lines.append(f"│ [{issue['id']}] {file_line} - {title}")
-                lines.append(f"│     Category: {issue.get('category', '?')} | Effort: {effort}")
-                fix = issue.get('suggested_fix', '')[:55]
+                lines.append(f"│     Category: {get('category', '?')} | Effort: {effort}")
+                fix = get('suggested_fix', '')[:55]
                 if fix:
                     lines.append(f"│     → {fix}")
                 lines.append("│")
-            lines.append("└" + "─" * 63 + "┘")
+            lines.append(_BOX_BOT)
             lines.append("")
 
         # Warning issues
         if warning_issues:
-            lines.append("┌" + "─" * 63 + "┐")
+            lines.append(_BOX_TOP)
             lines.append("│ ⚠️ WARNINGS (Should Fix)" + " " * 38 + "│")
-            lines.append("├" + "─" * 63 + "┤")
+            lines.append(_BOX_MID)
             for issue in warning_issues:
-                file_line = f"{issue.get('file', '?')}:{issue.get('line', '?')}"
-                title = issue.get('title', 'Issue')[:40]
-                effort = issue.get('effort', '?')
+                get = issue.get
+                file_line = f"{get('file', '?')}:{get('line', '?')}"
+                title = get('title', 'Issue')[:40]
+                effort = get('effort', '?')
                 lines.append(f"│ [{issue['id']}] {file_line} - {title}")
                 lines.append(f"│     Effort: {effort}")
                 lines.append("│")
-            lines.append("└" + "─" * 63 + "┘")
+            lines.append(_BOX_BOT)
             lines.append("")
 
         # Suggestions
         if suggestion_issues:
-            lines.append("┌" + "─" * 63 + "┐")
+            lines.append(_BOX_TOP)
             lines.append("│ 💡 SUGGESTIONS (Optional)" + " " * 37 + "│")
-            lines.append("├" + "─" * 63 + "┤")
+            lines.append(_BOX_MID)
             for issue in suggestion_issues:
                 title = issue.get('title', 'Suggestion')[:50]
                 lines.append(f"│ [{issue['id']}] {title}")
-            lines.append("└" + "─" * 63 + "┘")
+            lines.append(_BOX_BOT)
             lines.append("")
 
         # Positive aspects
@@ -393,10 +599,10 @@ def format_interactive_output(result: dict) -> str:
 
         # Selection hint
         if issues:
-            lines.append("─" * 65)
+            lines.append(_HR_THIN)
             lines.append("Select: numbers (1,2,3) | 'all' | 'blocking' | 'skip'")
 
-    lines.append("═" * 65)
+    lines.append(_HR)
     lines.append("")
 
     return "\n".join(lines)
@@ -408,9 +614,9 @@ def format_legacy_output(result: dict) -> str:
         return format_interactive_output(result)
 
     lines = []
-    lines.append("═" * 65)
+    lines.append(_HR)
     lines.append("🔍 GEMINI CODE REVIEW")
-    lines.append("═" * 65)
+    lines.append(_HR)
     lines.append("")
 
     summary = result.get("summary", {})
@@ -440,11 +646,13 @@ def format_legacy_output(result: dict) -> str:
         for p in positive:
             lines.append(f"- {p}")
 
-    lines.append("═" * 65)
+    lines.append(_HR)
     return "\n".join(lines)
 
 
 def main():
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Review code using Gemini 3.0 Flash",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -460,20 +668,30 @@ Examples:
     parser.add_argument("--focus", choices=["security", "performance", "quality"])
     parser.add_argument("--think", choices=["minimal", "medium", "high"],
                         help="Thinking depth (auto-detected if not specified)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the on-disk response cache")
+    parser.add_argument("--install", action="store_true",
+                        help="Install the google-genai package if missing")
 
     args = parser.parse_args()
+
+    if args.install and not ensure_genai_installed():
+        if not install_genai():
+            print("❌ Could not install google-genai")
+            sys.exit(1)
     files = [f.strip() for f in args.files.split(",") if f.strip()]
 
     if not files:
         print("❌ No files specified")
         sys.exit(1)
 
-    result = review_code(files, args.focus, args.think, args.json)
+    result = review_code(files, args.focus, args.think, args.json,
+                         use_cache=not args.no_cache)
 
     # Output
     if args.json:
         if "error" not in result:
-            print(json.dumps(result, indent=2, ensure_ascii=False))
+            print(_dumps(result))
         else:
             print(format_interactive_output(result))
     else:
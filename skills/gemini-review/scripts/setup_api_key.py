@@ -8,7 +8,8 @@ Usage:
     python setup_api_key.py --key "your-api-key"
 """
 
-import argparse
+import os
+import re
 import sys
 from pathlib import Path
 
@@ -24,27 +25,26 @@ def setup_api_key(api_key: str) -> bool:
         True if successful, False otherwise
     """
     env_file = Path.cwd() / '.env'
+    key_line = f'GEMINI_API_KEY="{api_key}"'
 
-    # Read existing content if file exists
-    existing_lines = []
-    if env_file.exists():
-        with open(env_file) as f:
-            for line in f:
-                # Skip existing GEMINI_API_KEY lines
-                if not line.strip().startswith('GEMINI_API_KEY='):
-                    existing_lines.append(line)
-
-    # Ensure file ends with newline before adding new key
-    if existing_lines and not existing_lines[-1].endswith('\n'):
-        existing_lines[-1] += '\n'
-
-    # Add new API key
-    existing_lines.append(f'GEMINI_API_KEY="{api_key}"\n')
-
-    # Write back
     try:
-        with open(env_file, 'w') as f:
-            f.writelines(existing_lines)
+        content = env_file.read_text() if env_file.exists() else ""
+
+        # Replace an existing key in place, otherwise append. The
+        # callable keeps the replacement literal so backslashes in the
+        # key are not treated as escape sequences.
+        content, replaced = re.subn(r'^\s*GEMINI_API_KEY=.*$', lambda _: key_line,
+                                    content, count=1, flags=re.MULTILINE)
+        if not replaced:
+            if content and not content.endswith('\n'):
+                content += '\n'
+            content += key_line + '\n'
+
+        # Write to a temp file and rename so a crash mid-write can never
+        # leave a corrupt .env behind
+        tmp_file = env_file.with_name('.env.tmp')
+        tmp_file.write_text(content)
+        os.replace(tmp_file, env_file)
 
         print(f"✅ API key saved to {env_file}")
         print("")
@@ -71,6 +71,8 @@ def validate_key_format(key: str) -> bool:
 
 
 def main():
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Setup Gemini API Key for code review",
         formatter_class=argparse.RawDescriptionHelpFormatter,